@@ -1,14 +1,30 @@
-import requests
+import asyncio
+import importlib.util
+import httpx
 import os
-import json
-from bs4 import BeautifulSoup
+import orjson
+from selectolax.lexbor import LexborHTMLParser
+import numpy as np
 import pandas as pd
 import sqlite3
-from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
+from collections import namedtuple
+from urllib.parse import urljoin
 
 
+# Arrow-backed strings are more compact and faster to scan when pyarrow is installed
+text_dtype = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else None
+
+# Rating words are unique in their first two letters, so those two bytes index a lookup table
+rating_words = ["One", "Two", "Three", "Four", "Five"]
+rating_lookup = np.zeros(65536, dtype='int8')
+rating_lookup[np.array(rating_words, dtype='S2').view(np.uint16)] = np.arange(1, 6, dtype='int8')
+
+# One scraped book as parsed from a catalogue page
+Book = namedtuple('Book', 'title price availability rating url')
+
+# Bumped whenever the books table changes; older databases are migrated on startup
+schema_version = 1
+
 # Create data directory if it doesn't exist
 data_dir = "scraped_data"
 if not os.path.exists(data_dir):
@@ -17,18 +33,20 @@ if not os.path.exists(data_dir):
 class BookScraper:
     def __init__(self):
         self.base_url = "http://books.toscrape.com/"
-        self.books = []
-
-    def fetch_webpage(self, url):
-        headers = {
+        self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        # Connection pool shared by every page fetch in a scraping run
+        self.limits = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+        # Scraped books are kept as Book tuples, which pandas turns into a DataFrame in one pass
+        self.books = []
 
+    async def fetch_webpage(self, client, url):
         try:
-            response = requests.get(url, headers=headers)
+            response = await client.get(url)
 
             if response.status_code == 200:
-                return response.text 
+                return response.content
             else:
                 print(f"Error: status code {response.status_code}") 
                 return None
@@ -37,97 +55,123 @@ class BookScraper:
             print(f"An error occurred: {str(e)}")  
             return None
 
-    def scrape_books_from_page(self, page_num=1):
-        url = f"{self.base_url}catalogue/page-{page_num}.html"
-        html_content = self.fetch_webpage(url)
+    async def fetch_page(self, client, page, url):
+        return page, await self.fetch_webpage(client, url)
 
-        if not html_content:
-            return False
+    async def scrape_pages(self, urls):
+        parsed = {}
+        # One pooled client so every page reuses the same keep-alive connections
+        async with httpx.AsyncClient(headers=self.headers, limits=self.limits) as client:
+            fetches = [self.fetch_page(client, page, url) for page, url in enumerate(urls, 1)]
+            # Parse each page as soon as it arrives while the remaining fetches are still in flight
+            for next_page in asyncio.as_completed(fetches):
+                page, html_content = await next_page
+                print(f"Scraping page {page}...")
+                parsed[page] = self._parse_html(html_content)
 
-        soup = BeautifulSoup(html_content, 'html.parser')
-        book_containers = soup.select('article.product_pod')
+        return [parsed[page] for page in range(1, len(urls) + 1)]
 
-        if not book_containers:
-            return False
+    def _parse_html(self, html_content):
+        if not html_content:
+            return []
 
-        for book in book_containers:
+        tree = LexborHTMLParser(html_content)
+        # Book links on catalogue pages are relative to the catalogue directory
+        catalogue_url = self.base_url + 'catalogue/'
+
+        books = []
+        for book in tree.css('article.product_pod'):
             # Extract book details
-            title = book.h3.a['title']
-            price = book.select_one('p.price_color').text
-            availability = book.select_one('p.availability').text.strip()
-            rating = book.select_one('p.star-rating')['class'][1]
+            link = book.css_first('h3 a')
+            price_node = book.css_first('p.price_color')
+            availability_node = book.css_first('p.availability')
+            rating_node = book.css_first('p.star-rating')
+
+            if link is None or price_node is None or rating_node is None:
+                print("Skipping a book with missing details")
+                continue
+
+            title = link.attributes['title']
+            price = price_node.text()
+            availability = availability_node.text().strip() if availability_node is not None else ''
+            rating = rating_node.attributes['class'].split()[1]
 
             # Get book URL for additional details
-            book_url = book.h3.a['href']
-            if 'catalogue/' not in book_url:
-                book_url = 'catalogue/' + book_url
-            book_full_url = self.base_url + book_url
+            book_full_url = urljoin(catalogue_url, link.attributes['href'])
 
-            self.books.append({
-                'title': title,
-                'price': price,
-                'availability': availability,
-                'rating': rating,
-                'url': book_full_url
-            })
+            books.append(Book(title, price, availability, rating, book_full_url))
 
-        return True
+        return books
 
     def scrape_multiple_pages(self, num_pages=1):  # Reduced to 1 page for quicker demo
-        for page in range(1, num_pages + 1):
-            print(f"Scraping page {page}...")
-            success = self.scrape_books_from_page(page)
-            if not success:
+        urls = [f"{self.base_url}catalogue/page-{page}.html" for page in range(1, num_pages + 1)]
+        print(f"Fetching {len(urls)} page(s)...")
+        pages = asyncio.run(self.scrape_pages(urls))
+
+        for page, books in enumerate(pages, 1):
+            if not books:
                 print(f"Failed to scrape page {page} or no more pages available.")
                 break
+            self.books.extend(books)
 
         print(f"Scraped a total of {len(self.books)} books.")
-        return self.books
+        return self.as_dataframe()
+
+    def as_dataframe(self):
+        return pd.DataFrame(self.books, columns=Book._fields)
 
     def save_to_json(self, filename="books_data.json"):
         filepath = os.path.join(data_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.books, f, indent=4)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps([book._asdict() for book in self.books], option=orjson.OPT_INDENT_2))
         print(f"Book data saved to {filepath}")
 
 
 class BookDataAnalyzer:
-    def __init__(self, books_data=None, json_file=None):
+    def __init__(self, books_data=None):
         self.df = pd.DataFrame()
 
-        if books_data:
+        if books_data is not None and len(books_data) > 0:
             print("Initializing analyzer with provided book data...")
             self.df = pd.DataFrame(books_data)
             self._preprocess_data()
-        elif json_file:
-            print(f"Loading data from JSON file: {json_file}")
-            try:
-                filepath = os.path.join(data_dir, json_file)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    books_data = json.load(f)
-                self.df = pd.DataFrame(books_data)
-                self._preprocess_data()
-                print(f"Successfully loaded {len(self.df)} books from JSON")
-            except Exception as e:
-                print(f"Error loading JSON file: {str(e)}")
+
+    @classmethod
+    def from_db(cls, db):
+        analyzer = cls()
+        print("Loading data from database...")
+        try:
+            # Columns come back already cleaned, so no preprocessing is needed
+            analyzer.df = pd.read_sql_query(
+                'SELECT title, price AS price_numeric, rating AS rating_numeric, availability, url FROM books',
+                db.conn,
+                dtype={'price_numeric': 'float32', 'rating_numeric': 'int8'}
+            )
+            analyzer._convert_text_columns()
+            print(f"Successfully loaded {len(analyzer.df)} books from database")
+        except Exception as e:
+            print(f"Error loading from database: {str(e)}")
+        return analyzer
 
     def _preprocess_data(self):
         print("Preprocessing data...")
         # Clean price
-        self.df['price_numeric'] = self.df['price'].str.replace('Â£', '', regex=False).str.replace('£', '', regex=False).astype(float)
+        self.df['price_numeric'] = self.df['price'].str.replace(r'[£Â]', '', regex=True).astype('float32')
 
         # Map ratings
-        rating_map = {
-            "One": 1, 
-            "Two": 2,
-            "Three": 3,
-            "Four": 4,
-            "Five": 5,
-        }
+        rating_keys = self.df['rating'].to_numpy(dtype='S2').view(np.uint16)
+        self.df['rating_numeric'] = rating_lookup[rating_keys]
 
-        self.df['rating_numeric'] = self.df['rating'].map(rating_map)
+        self._convert_text_columns()
         print("Data preprocessing complete")
 
+    def _convert_text_columns(self):
+        if text_dtype is None:
+            return
+
+        text_columns = [col for col in ('title', 'availability', 'url') if col in self.df]
+        self.df[text_columns] = self.df[text_columns].astype(text_dtype)
+
     def get_summary_stats(self):
         print("Calculating summary statistics...")
         if self.df.empty:
@@ -136,32 +180,24 @@ class BookDataAnalyzer:
 
         stats = {
             'total_books': len(self.df),
-            'avg_price': self.df['price_numeric'].mean(),
-            'min_price': self.df['price_numeric'].min(),
-            'max_price': self.df['price_numeric'].max(),
-            'avg_rating': self.df['rating_numeric'].mean()
+            'avg_price': float(self.df['price_numeric'].mean()),
+            'min_price': float(self.df['price_numeric'].min()),
+            'max_price': float(self.df['price_numeric'].max()),
+            'avg_rating': float(self.df['rating_numeric'].mean())
         }
 
         print("Statistics calculated successfully")
         return stats
 
-    def get_best_value_book(self, min_rating=4, n=5):
-        print(f"Finding best value books with rating >= {min_rating}...")
-        if self.df.empty:
-            print("Warning: DataFrame is empty")
-            return pd.DataFrame()
-
-        value_books = self.df[self.df['rating_numeric'] >= min_rating]
-        result = value_books.sort_values('price_numeric').head(n)
-        print(f"Found {len(result)} matching books")
-        return result
-
-
     def plot_price_distribution(self):
         if self.df.empty:
             print("No data to plot.")
             return
 
+        # Plotting libraries are slow to import, so load them only when a plot is requested
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         plt.figure(figsize=(10, 6))
         sns.histplot(self.df['price_numeric'], kde=True, bins=20, color='skyblue')
         plt.title('Distribution of Book Prices')
@@ -176,6 +212,9 @@ class BookDataAnalyzer:
             print("No data to plot.")
             return
 
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         avg_price = self.df.groupby('rating_numeric')['price_numeric'].mean().reset_index()
 
         plt.figure(figsize=(8, 5))
@@ -191,6 +230,9 @@ class BookDataAnalyzer:
             print("No data to plot.")
             return
 
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         plt.figure(figsize=(8, 5))
         sns.countplot(data=self.df, x='rating_numeric', hue='rating_numeric', palette='pastel', legend=False)
 
@@ -207,34 +249,65 @@ class BookDataAnalyzer:
 class BookDatabase:
     def __init__(self):
         print("Initializing database...")
-        # Try to remove the existing database to avoid locks
         db_path = os.path.join(data_dir, "books_database.db")
-        try:
-            if os.path.exists(db_path):
-                os.remove(db_path)
-                print("Removed existing database")
-        except Exception as e:
-            print(f"Note: Could not remove existing database: {e}")
-
         self.conn = sqlite3.connect(db_path)
+        # WAL with NORMAL sync avoids an fsync per commit; durability is not critical for scraped data
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-65536')
         self.cursor = self.conn.cursor()
         self._create_tables()
         print("Database initialized successfully")
 
     def _create_tables(self):
         print("Creating tables...")
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS books (
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'books'")
+        books_exists = self.cursor.fetchone() is not None
+        self.cursor.execute('PRAGMA user_version')
+        version = self.cursor.fetchone()[0]
+
+        if books_exists and version < schema_version:
+            self._migrate_books_table()
+        else:
+            self._create_books_table('books')
+
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_rating_price ON books(rating, price)')
+        self.cursor.execute(f'PRAGMA user_version = {schema_version}')
+        self.conn.commit()
+        print("Tables created successfully")
+
+    def _create_books_table(self, name):
+        self.cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 title TEXT NOT NULL,
                 price REAL NOT NULL,
                 rating INTEGER NOT NULL,
                 availability TEXT,
-                url TEXT            
+                url TEXT UNIQUE
             )
         ''')
-        self.conn.commit()
-        print("Tables created successfully")
+
+    def _migrate_books_table(self):
+        # Databases from older versions lack the unique url, so copy the rows into a fresh table
+        print("Upgrading books table to the current schema...")
+        try:
+            self.cursor.execute('BEGIN')
+            self._create_books_table('books_new')
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO books_new (id, title, price, rating, availability, url)
+            SELECT id, title, price, rating, availability, url
+            FROM books
+            ORDER BY id
+            ''')
+            self.cursor.execute('DROP TABLE books')
+            self.cursor.execute('ALTER TABLE books_new RENAME TO books')
+            self.conn.commit()
+            print("Books table upgraded")
+        except Exception:
+            self.conn.rollback()
+            raise
 
     def insert_books(self, books_df):
         print("Inserting books into database...")
@@ -242,36 +315,38 @@ class BookDatabase:
             print("Warning: No books to insert (DataFrame is empty)")
             return
 
-        # Get existing titles
+        columns = ['title', 'price_numeric', 'rating_numeric', 'availability', 'url']
+        rows = (
+            books_df[columns]
+            .astype({'price_numeric': float, 'rating_numeric': int})
+            .round({'price_numeric': 2})
+            .itertuples(index=False, name=None)
+        )
+
+        # One transaction for the whole batch; the unique url skips books already stored
         try:
-            self.cursor.execute('SELECT title from books')
-            existing_titles = [row[0] for row in self.cursor.fetchall()]
-        except:
-            existing_titles = []
-
-        insert_count = 0
-        for _, row in books_df.iterrows():
-            if row['title'] not in existing_titles:
-                try:
-                    self.cursor.execute('''
-                    INSERT INTO books (title, price, rating, availability, url)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        row['title'],
-                        row['price_numeric'],
-                        row['rating_numeric'],
-                        row['availability'],
-                        row['url']
-                    ))
-                    insert_count += 1
-                except Exception as e:
-                    print(f"Error inserting book {row['title']}: {e}")
+            with self.conn:
+                changes_before = self.conn.total_changes
+                self.cursor.executemany('''
+                INSERT OR IGNORE INTO books (title, price, rating, availability, url)
+                VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                insert_count = self.conn.total_changes - changes_before
+        except Exception as e:
+            print(f"Error inserting books: {e}")
+            return
 
-        self.conn.commit()
         print(f"Added {insert_count} new books to database")
 
     def get_book_by_id(self, book_id):
         print(f"Looking up book with ID {book_id}...")
+        # Bind an integer so SQLite goes straight to the primary key
+        try:
+            book_id = int(book_id)
+        except ValueError:
+            print(f"Invalid book ID: {book_id}")
+            return None
+
         try:
             self.cursor.execute('''
             SELECT id, title, price, rating, availability, url
@@ -289,6 +364,25 @@ class BookDatabase:
             print(f"Error looking up book: {e}")
             return None
 
+    def best_value(self, min_rating=4, n=5):
+        print(f"Finding best value books with rating >= {min_rating}...")
+        # Filter, sort and limit in SQLite so only the top rows reach Python
+        try:
+            self.cursor.execute('''
+            SELECT title, price, rating
+            FROM books
+            WHERE rating >= ?
+            ORDER BY price ASC
+            LIMIT ?
+            ''', (min_rating, n))
+
+            books = self.cursor.fetchall()
+            print(f"Found {len(books)} matching books")
+            return books
+        except Exception as e:
+            print(f"Error finding best value books: {e}")
+            return []
+
     def close(self):
         print("Closing database connection...")
         if self.conn:
@@ -346,8 +440,8 @@ def main():
                 print("\n--- Book Statistics ---")
                 # Load analyzer if not already loaded
                 if analyzer is None or analyzer.is_empty():
-                    print("No data loaded. Attempting to load from JSON file...")
-                    analyzer = BookDataAnalyzer(json_file="books_data.json")
+                    print("No data loaded. Attempting to load from database...")
+                    analyzer = BookDataAnalyzer.from_db(db)
                     if analyzer.is_empty():
                         print("Could not load data. Please scrape books first (Option 1).")
                         continue
@@ -363,14 +457,6 @@ def main():
 
             elif choice == '3':
                 print("\n--- Best Value Books ---")
-                # Load analyzer if not already loaded
-                if analyzer is None or analyzer.is_empty():
-                    print("No data loaded. Attempting to load from JSON file...")
-                    analyzer = BookDataAnalyzer(json_file="books_data.json")
-                    if analyzer.is_empty():
-                        print("Could not load data. Please scrape books first (Option 1).")
-                        continue
-
                 # Get rating from user
                 try:
                     rating = int(input("Enter minimum rating (1-5): "))
@@ -382,26 +468,18 @@ def main():
                     continue
 
 
-                best_books = analyzer.get_best_value_book(min_rating=rating)
+                best_books = db.best_value(min_rating=rating)
 
-                if best_books.empty:
+                if not best_books:
                     print(f"No books found with rating {rating} or higher")
                 else:
                     print(f"\nBest Value Books (Rating {rating}+):")
-                    for i, (_, book) in enumerate(best_books.iterrows(), 1):
-                        print(f"{i}. {book['title']} - £{book['price_numeric']:.2f}")
+                    for i, (title, price, _) in enumerate(best_books, 1):
+                        print(f"{i}. {title} - £{price:.2f}")
 
             elif choice == '4':
                 print("\n--- Look Up Book by ID ---")
 
-                if analyzer is None or analyzer.is_empty():
-                    print("No data loaded. Attempting to load from JSON file...")
-                    analyzer = BookDataAnalyzer(json_file="books_data.json")
-                    if analyzer.is_empty():
-                        print("Could not load data. Please scrape books first (Option 1).")
-                        continue
-
-
                 # Lookup and display book
                 book_id = input("Enter the book ID: ")
                 book = db.get_book_by_id(book_id)
@@ -420,8 +498,8 @@ def main():
             elif choice == '5':
                 print("\n--- Data Visualizations ---")
                 if analyzer is None or analyzer.is_empty():
-                    print("No data loaded. Attempting to load from JSON file...")
-                    analyzer = BookDataAnalyzer(json_file="books_data.json")
+                    print("No data loaded. Attempting to load from database...")
+                    analyzer = BookDataAnalyzer.from_db(db)
                     if analyzer.is_empty():
                         print("Could not load data. Please scrape books first (Option 1).")
                         continue